@@ -1,84 +1,356 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# PyArrow's CSV reader parses in parallel; fall back to the C engine without it.
+# It also backs the Parquet cache, which is skipped when it's missing.
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+CSV_ENGINE = "pyarrow" if HAS_PYARROW else "c"
 
 st.set_page_config(page_title="Marketing & Business Dashboard", layout="wide")
 
+# Data sources: (csv path, source name)
+SOURCES = [
+    ("Facebook.csv", "Facebook"),
+    ("data/Google.csv", "Google"),
+    ("data/TikTok.csv", "TikTok"),
+    ("business.csv", "Business"),
+]
+CHANNELS = ["Facebook", "Google", "TikTok"]
+# Fixed categories keep the dtype intact through pd.concat and make groupby keys int codes
+CHANNEL_DTYPE = pd.CategoricalDtype(CHANNELS)
+
+# Normalized frames from the last cold load, reused on warm starts
+MKT_CACHE = "data/_cache_mkt.parquet"
+BIZ_CACHE = "data/_cache_biz.parquet"
+
+# Marketing files larger than this are streamed in chunks and folded into daily totals,
+# so peak memory tracks the number of days rather than the number of rows
+STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024
+STREAM_CHUNK_ROWS = 1 << 20
+
 #Utility Safe Loader 
-def safe_read(path, source_name):
-    """Read CSV safely, return DataFrame or empty with warning"""
+def safe_read(path, source_name, usecols=None, dtype=None, parse_dates=None):
+    """Read CSV safely, return (DataFrame, problem) where problem is None or (st_func, message).
+
+    usecols may be a predicate on the raw header names; parse_dates takes
+    cleaned names and only applies to headers that exist. Runs on loader
+    threads, so it must not call Streamlit itself.
+    """
     if os.path.exists(path):
         try:
-            df = pd.read_csv(path)
-            return df
+            if source_name in CHANNELS and os.path.getsize(path) > STREAM_THRESHOLD_BYTES:
+                return stream_daily_totals(path, source_name), None
+            # Parquet copy from an earlier parse, written next to the CSV
+            sidecar = os.path.splitext(path)[0] + ".parquet"
+            if parquet_is_fresh([sidecar], [path]):
+                try:
+                    return pd.read_parquet(sidecar), None
+                except Exception:
+                    # Unreadable copy: drop it and parse the CSV, which rewrites it
+                    try:
+                        os.remove(sidecar)
+                    except OSError:
+                        pass
+            header = pd.read_csv(path, nrows=0).columns
+            if parse_dates:
+                # Callers pass canonical names; the file may spell them "Date" or " date"
+                parse_dates = [c for c in header if c.strip().lower() in parse_dates] or None
+            if callable(usecols) and CSV_ENGINE == "pyarrow":
+                # The pyarrow engine only takes explicit names, so resolve them from the header
+                usecols = [c for c in header if usecols(c)]
+            df = pd.read_csv(path, engine=CSV_ENGINE, usecols=usecols, dtype=dtype, parse_dates=parse_dates)
+            write_parquet({sidecar: df})
+            return df, None
         except Exception as e:
-            st.error(f"⚠️ Could not load {source_name}: {e}")
-            return pd.DataFrame()
+            return pd.DataFrame(), (st.error, f"⚠️ Could not load {source_name}: {e}")
     else:
-        st.warning(f"⚠️ File not found: {path}")
-        return pd.DataFrame()
+        return pd.DataFrame(), (st.warning, f"⚠️ File not found: {path}")
+
+def read_source(path, source_name):
+    """safe_read with the known schema pushed into the parser"""
+    if source_name in CHANNELS:
+        return safe_read(
+            path, source_name,
+            # Only date and the summed metrics are used; skip parsing the label columns
+            usecols=lambda c: MARKETING_COLMAP.get(c.strip().lower()) in ["date", *MARKETING_METRICS],
+            # pyarrow infers types anyway and then casts every column once a dtype
+            # dict is given, which fails on a blank count cell; norm casts money there
+            dtype=MARKETING_DTYPES if CSV_ENGINE == "c" else None,
+            parse_dates=["date"]
+        )
+    return safe_read(path, source_name, parse_dates=["date"])
+
+def stream_daily_totals(path, source_name):
+    """Read a large marketing CSV chunk by chunk, keeping only per-date metric sums"""
+    acc = None
+    dates = [c for c in pd.read_csv(path, nrows=0).columns if c.strip().lower() == "date"] or None
+    # chunksize needs the C engine; pyarrow always reads the whole file
+    for chunk in pd.read_csv(path, chunksize=STREAM_CHUNK_ROWS, parse_dates=dates):
+        chunk = norm(chunk, source_name)
+        if "date" not in chunk.columns:
+            # No date column: the whole file sums into one undated row
+            chunk = chunk.assign(date=pd.NaT)
+        daily = chunk.groupby("date", observed=True, dropna=False)[MARKETING_METRICS].sum()
+        acc = daily if acc is None else acc.add(daily, fill_value=0)
+    return norm(acc.reset_index(), source_name) if acc is not None else pd.DataFrame()
+
+def daily_totals(df, source_name):
+    """Collapse a normalized marketing frame to one row per date.
+
+    The dashboard only ever sums marketing metrics by date and source, so the
+    per-row labels (campaign, tactic, state) are not kept. Rows without a date
+    are kept as a NaT row so channel totals still include them, as is the
+    whole file when it has no date column.
+    """
+    if df.empty:
+        return df
+    if "date" not in df.columns:
+        df = df.assign(date=pd.NaT)
+    return norm(df.groupby("date", observed=True, dropna=False)[MARKETING_METRICS].sum().reset_index(), source_name)
 
 #Normalizer for Marketing 
+MARKETING_COLMAP = {
+    "date": "date",
+    "tactic": "tactic",
+    "state": "state",
+    "campaign": "campaign",
+    "impression": "impressions",
+    "impressions": "impressions",
+    "clicks": "clicks",
+    "spend": "spend",
+    "attributed revenue": "revenue",  # TikTok naming
+    "revenue": "revenue"
+}
+MARKETING_METRICS = ["impressions", "clicks", "spend", "revenue"]
+# Parser dtypes for the raw money headers, so the C reader skips inferring them.
+# Counts are left to inference (a blank cell would break an int dtype) and downcast in norm.
+MARKETING_DTYPES = {"spend": "float32", "attributed revenue": "float32", "revenue": "float32"}
+
 def norm(df, source_name):
-    """Normalize marketing data columns"""
+    """Normalize marketing data columns (renames df's columns in place)"""
     if df.empty:
         return df
 
-    df = df.rename(columns={c: c.strip().lower() for c in df.columns})
-    colmap = {
-        "date": "date",
-        "tactic": "tactic",
-        "state": "state",
-        "campaign": "campaign",
-        "impressions": "impressions",
-        "clicks": "clicks",
-        "spend": "spend",
-        "attributed revenue": "revenue",  # TikTok naming
-        "revenue": "revenue"
-    }
-    df = df.rename(columns={k: v for k, v in colmap.items() if k in df.columns})
+    # One pass over the headers: clean, then map to the canonical name
+    cleaned = (c.strip().lower() for c in df.columns)
+    df.columns = [MARKETING_COLMAP.get(c, c) for c in cleaned]
 
     # Add missing cols as 0
-    for col in ["impressions", "clicks", "spend", "revenue"]:
+    for col in MARKETING_METRICS:
         if col not in df.columns:
             df[col] = 0
 
-    df["source"] = source_name
-    if "date" in df.columns:
+    # Counts fit small unsigned ints and money fits float32, halving what the sums scan
+    for col in ["impressions", "clicks"]:
+        df[col] = pd.to_numeric(df[col], downcast="unsigned")
+    for col in ["spend", "revenue"]:
+        df[col] = df[col].astype("float32")
+
+    df["source"] = pd.Series(source_name, index=df.index, dtype=CHANNEL_DTYPE)
+    # Already parsed by the reader unless it hit unparseable values
+    if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
         df["date"] = pd.to_datetime(df["date"], errors="coerce")
     return df
 
+#Parquet Cache
+def parquet_is_fresh(outputs, inputs):
+    """True if every Parquet output is newer than every input file and this script"""
+    inputs = list(inputs) + [__file__]
+    if not HAS_PYARROW or not all(os.path.exists(p) for p in list(outputs) + inputs):
+        return False
+    return min(os.path.getmtime(p) for p in outputs) >= max(os.path.getmtime(p) for p in inputs)
+
+def write_parquet(frames):
+    """Write {path: df} as Parquet, best effort: a read-only checkout just means every start is a cold one"""
+    if not HAS_PYARROW:
+        return
+    tmps = {}
+    try:
+        # Write beside the target and rename into place, so an interrupted write
+        # never leaves a truncated file that looks fresh
+        for path, df in frames.items():
+            fd, tmps[path] = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp.parquet")
+            os.close(fd)
+            df.to_parquet(tmps[path], compression="zstd")
+        for path, tmp in tmps.items():
+            os.replace(tmp, path)
+    except Exception:
+        for tmp in tmps.values():
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+#Business Columns
+BUSINESS_COLMAP = {
+    "# of orders": "orders",
+    "# or new orders": "new_orders",
+    "new customers": "new_customers",
+    "total revenue": "total_revenue",
+    "gross profit": "gross_profit",
+    "cogs": "cogs"
+}
+
 # Load Data
 @st.cache_data
 def load_data():
-    fb = safe_read("Facebook.csv", "Facebook")
-    gg = safe_read("data/Google.csv", "Google")
-    tk = safe_read("data/TikTok.csv", "TikTok")
-    biz = safe_read("business.csv", "Business")
+    # Warm start: skip CSV parsing entirely if nothing changed since the last load
+    if parquet_is_fresh([MKT_CACHE, BIZ_CACHE], [path for path, _ in SOURCES]):
+        try:
+            return pd.read_parquet(MKT_CACHE), pd.read_parquet(BIZ_CACHE)
+        except Exception:
+            pass  # Unreadable cache: rebuild it from the CSVs below
+
+    # Read all files concurrently; the CSV parser releases the GIL
+    with ThreadPoolExecutor(max_workers=len(SOURCES)) as ex:
+        results = list(ex.map(lambda src: read_source(*src), SOURCES))
 
-    # Normalize marketing
+    # Streamlit isn't thread-safe, so report problems after the join
+    frames = {}
+    all_loaded = True
+    for (_, source_name), (df, problem) in zip(SOURCES, results):
+        if problem:
+            report, msg = problem
+            report(msg)
+            all_loaded = False
+        frames[source_name] = df
+    biz = frames["Business"]
+
+    # Normalize marketing, aggregating each source to daily totals before the concat
     mkt = pd.concat(
-        [norm(fb, "Facebook"), norm(gg, "Google"), norm(tk, "TikTok")],
+        [daily_totals(norm(frames[name], name), name) for name in CHANNELS],
         ignore_index=True
     )
+    # A sorted DatetimeIndex lets the date groupby and any range slicing use the monotonic fast path
+    if "date" in mkt.columns:
+        mkt = mkt.set_index("date").sort_index()
 
     # Fix Business column names
     if not biz.empty:
-        biz = biz.rename(columns={c: c.strip().lower() for c in biz.columns})
-        biz = biz.rename(columns={
-            "# of orders": "orders",
-            "# or new orders": "new_orders",
-            "new customers": "new_customers",
-            "total revenue": "total_revenue",
-            "gross profit": "gross_profit",
-            "cogs": "cogs"
-        })
-        if "date" in biz.columns:
+        cleaned = (c.strip().lower() for c in biz.columns)
+        biz.columns = [BUSINESS_COLMAP.get(c, c) for c in cleaned]
+        if "date" in biz.columns and not pd.api.types.is_datetime64_any_dtype(biz["date"]):
             biz["date"] = pd.to_datetime(biz["date"], errors="coerce")
+        # Counts downcast losslessly; money stays float64 as its totals are shown to the dollar
+        for col in ["orders", "new_orders", "new_customers"]:
+            if col in biz.columns:
+                biz[col] = pd.to_numeric(biz[col], downcast="unsigned")
+
+    # Only cache complete loads so missing-file warnings keep showing
+    if all_loaded:
+        write_parquet({MKT_CACHE: mkt, BIZ_CACHE: biz})
     return mkt, biz
 
+# Aggregations
+def safe_ratio(num, den):
+    """num / den as float32 with NaN where den is 0, in one masked ufunc call"""
+    shape = np.broadcast(num, den).shape
+    return np.divide(num, den, out=np.full(shape, np.nan, dtype="float32"), where=np.asarray(den) != 0)
+
+def frame_hash(df):
+    """Cheap content fingerprint so Streamlit doesn't pickle whole frames to hash them"""
+    return df.shape, int(pd.util.hash_pandas_object(df, index=True).sum())
+
+@st.cache_data(hash_funcs={pd.DataFrame: frame_hash})
+def build_aggregates(mkt, biz):
+    """Run the dashboard groupbys once per dataset instead of on every rerun"""
+    empty = pd.DataFrame()
+    if mkt.empty:
+        return empty, empty, empty, empty
+
+    # Single hash pass over mkt; the other roll-ups regroup this small frame.
+    # dropna=False keeps undated rows so the channel totals still count them;
+    # the per-date roll-up below drops them again.
+    mkt_day = mkt.groupby(
+        [pd.Grouper(level="date"), "source"], sort=False, observed=True, dropna=False
+    ).agg(
+        spend=("spend", "sum"),
+        revenue=("revenue", "sum")
+    )
+    by_date = mkt_day.groupby(level="date", observed=True).sum()
+    spend_rev_by_date = by_date.reset_index()
+    # Every per-channel chart reads channel_perf. It has one row per channel, so
+    # do the arithmetic on plain arrays and add the derived column in one assign.
+    by_source = mkt_day.groupby(level="source", observed=True).sum()
+    spend = by_source["spend"].to_numpy()
+    revenue = by_source["revenue"].to_numpy()
+    channel_perf = by_source.reset_index().assign(roas=safe_ratio(revenue, spend))
+
+    # Long format for the grouped share bars, built directly rather than via assign + melt
+    sources = channel_perf["source"].to_numpy()
+    spend_share = pd.DataFrame({
+        "source": np.tile(sources, 2),
+        "variable": np.repeat(["spend_share", "rev_share"], len(sources)),
+        "value": np.concatenate([safe_ratio(spend, spend.sum()), safe_ratio(revenue, revenue.sum())])
+    })
+
+    rev_compare = empty
+    if not biz.empty and "total_revenue" in biz.columns and "date" in biz.columns:
+        # Both sides come out of groupby with a sorted DatetimeIndex, so plain index
+        # alignment replaces a join; reindexing keeps only business dates (a left join)
+        biz_rev = biz.groupby("date", observed=True)["total_revenue"].sum()
+        rev_compare = pd.DataFrame({
+            "total_revenue": biz_rev,
+            "attributed_revenue": by_date["revenue"].reindex(biz_rev.index)
+        }).reset_index()
+    return spend_rev_by_date, channel_perf, spend_share, rev_compare
+
+@st.cache_data(hash_funcs={pd.DataFrame: frame_hash})
+def build_biz_totals(biz):
+    """Business column totals shared by the overview metrics and the insights"""
+    cols = [c for c in ["orders", "new_orders", "new_customers", "total_revenue", "gross_profit"] if c in biz.columns]
+    # One reduction over all columns instead of a sum() per column. Mixing int
+    # and float columns upcasts the result, so give counts back as ints.
+    sums = biz[cols].sum()
+    return {c: int(v) if pd.api.types.is_integer_dtype(biz[c]) else v for c, v in sums.items()}
+
+# Figures
+# Cached as shared resources (plotly_chart only serializes them); the frames
+# themselves are skipped by the hasher and df_key stands in for their contents.
+# df_key changes whenever a CSV is edited, so bound the entries to evict stale figures.
+FIGURE_CACHE_ENTRIES = 16
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def bar_chart(_df, df_key, **kwargs):
+    return px.bar(_df, **kwargs)
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def line_chart(_df, df_key, x, y, title):
+    """One go.Scatter trace per column; px.line would groupby the frame first"""
+    cols = [y] if isinstance(y, str) else y
+    return go.Figure(
+        [go.Scatter(x=_df[x], y=_df[col], name=col, mode="lines") for col in cols],
+        layout=go.Layout(
+            title=title,
+            xaxis_title=x,
+            yaxis_title=y if isinstance(y, str) else "value",
+            legend_title="variable"
+        )
+    )
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def area_chart(_df, df_key, **kwargs):
+    return px.area(_df, **kwargs)
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def scatter_chart(_df, df_key, **kwargs):
+    return px.scatter(_df, **kwargs)
+
 mkt, biz = load_data()
+spend_rev_by_date, channel_perf, spend_share, rev_compare = build_aggregates(mkt, biz)
+biz_totals = build_biz_totals(biz)
+channel_key = frame_hash(channel_perf)
+biz_key = frame_hash(biz)
 
 # Dashboard 
 st.title("📊 Marketing & Business Performance Dashboard")
@@ -86,25 +358,19 @@ st.title("📊 Marketing & Business Performance Dashboard")
 # Section 1: Overview
 st.header("🔎 Business Overview")
 if not biz.empty:
-    total_orders = biz["orders"].sum() if "orders" in biz.columns else 0
-    total_new_orders = biz["new_orders"].sum() if "new_orders" in biz.columns else 0
-
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Orders", f"{total_orders:,}")
-    col2.metric("New Customers", f"{biz['new_customers'].sum():,}" if "new_customers" in biz.columns else "N/A")
-    col3.metric("Revenue", f"${biz['total_revenue'].sum():,.0f}" if "total_revenue" in biz.columns else "N/A")
-    col4.metric("Gross Profit", f"${biz['gross_profit'].sum():,.0f}" if "gross_profit" in biz.columns else "N/A")
+    col1.metric("Total Orders", f"{biz_totals.get('orders', 0):,}")
+    col2.metric("New Customers", f"{biz_totals['new_customers']:,}" if "new_customers" in biz_totals else "N/A")
+    col3.metric("Revenue", f"${biz_totals['total_revenue']:,.0f}" if "total_revenue" in biz_totals else "N/A")
+    col4.metric("Gross Profit", f"${biz_totals['gross_profit']:,.0f}" if "gross_profit" in biz_totals else "N/A")
 else:
     st.warning("No Business data available.")
 
 # Section 2: Marketing Spend vs Revenue
 st.header("💰 Marketing Efficiency")
 if not mkt.empty:
-    spend_by_source = mkt.groupby("source", as_index=False)["spend"].sum()
-    rev_by_source = mkt.groupby("source", as_index=False)["revenue"].sum()
-
-    fig1 = px.bar(spend_by_source, x="source", y="spend", title="Total Spend by Channel")
-    fig2 = px.bar(rev_by_source, x="source", y="revenue", title="Total Attributed Revenue by Channel")
+    fig1 = bar_chart(channel_perf, channel_key, x="source", y="spend", title="Total Spend by Channel")
+    fig2 = bar_chart(channel_perf, channel_key, x="source", y="revenue", title="Total Attributed Revenue by Channel")
 
     col1, col2 = st.columns(2)
     col1.plotly_chart(fig1, use_container_width=True)
@@ -116,15 +382,16 @@ else:
 st.header("📈 Trends Over Time")
 if not biz.empty and "date" in biz.columns:
     if "orders" in biz.columns:
-        fig3 = px.line(biz, x="date", y="orders", title="Orders Over Time")
+        fig3 = line_chart(biz, biz_key, x="date", y="orders", title="Orders Over Time")
         st.plotly_chart(fig3, use_container_width=True)
     if "total_revenue" in biz.columns:
-        fig4 = px.line(biz, x="date", y="total_revenue", title="Revenue Over Time")
+        fig4 = line_chart(biz, biz_key, x="date", y="total_revenue", title="Revenue Over Time")
         st.plotly_chart(fig4, use_container_width=True)
 
 if not mkt.empty:
-    fig5 = px.line(
-        mkt.groupby("date", as_index=False)[["spend", "revenue"]].sum(),
+    fig5 = line_chart(
+        spend_rev_by_date,
+        frame_hash(spend_rev_by_date),
         x="date",
         y=["spend", "revenue"],
         title="Marketing Spend vs Attributed Revenue"
@@ -134,21 +401,13 @@ if not mkt.empty:
 # Section 4: ROI
 st.header("📌 ROI by Channel")
 if not mkt.empty:
-    channel_perf = mkt.groupby("source", as_index=False).agg(
-        spend=("spend", "sum"),
-        revenue=("revenue", "sum")
-    )
-    channel_perf["roas"] = channel_perf["revenue"] / channel_perf["spend"].replace(0, pd.NA)
-    fig6 = px.bar(channel_perf, x="source", y="roas", title="ROAS by Channel", text="roas")
+    fig6 = bar_chart(channel_perf, channel_key, x="source", y="roas", title="ROAS by Channel", text="roas")
     st.plotly_chart(fig6, use_container_width=True)
 
     # Section 5: Spend Share vs Revenue Share
-    spend_share = channel_perf.copy()
-    spend_share["spend_share"] = spend_share["spend"] / spend_share["spend"].sum()
-    spend_share["rev_share"] = spend_share["revenue"] / spend_share["revenue"].sum()
-
-    fig_share = px.bar(
-        spend_share.melt(id_vars="source", value_vars=["spend_share", "rev_share"]),
+    fig_share = bar_chart(
+        spend_share,
+        frame_hash(spend_share),
         x="source",
         y="value",
         color="variable",
@@ -159,35 +418,27 @@ if not mkt.empty:
     st.plotly_chart(fig_share, use_container_width=True)
 
     # Section 6: Profitability Scatter
-    if not biz.empty and "orders" in biz.columns and "new_orders" in biz.columns:
-        total_orders = biz["orders"].sum()
-        total_new_orders = biz["new_orders"].sum()
+    if "orders" in biz_totals and "new_orders" in biz_totals:
+        total_orders = biz_totals["orders"]
+        total_new_orders = biz_totals["new_orders"]
         if total_orders > 0 and total_new_orders > 0:
-            gm_per_order = (biz["gross_profit"].sum() / total_orders) if "gross_profit" in biz.columns else 0
-            cac_df = channel_perf.copy()
-            cac_df["cac"] = cac_df["spend"] / total_new_orders if total_new_orders > 0 else 0
-            cac_df["gm_per_order"] = gm_per_order
+            gm_per_order = (biz_totals["gross_profit"] / total_orders) if "gross_profit" in biz_totals else 0
+            cac_df = channel_perf.assign(
+                cac=channel_perf["spend"].to_numpy() / total_new_orders,
+                gm_per_order=gm_per_order
+            )
 
-            fig_scatter = px.scatter(
-                cac_df, x="cac", y="gm_per_order", text="source",
+            fig_scatter = scatter_chart(
+                cac_df, frame_hash(cac_df), x="cac", y="gm_per_order", text="source",
                 title="CAC vs Gross Margin per Order",
                 labels={"cac": "Customer Acquisition Cost", "gm_per_order": "Gross Margin per Order"}
             )
             st.plotly_chart(fig_scatter, use_container_width=True)
 
     # Section 7: Attribution Gap
-    if not biz.empty and "total_revenue" in biz.columns and "date" in biz.columns:
-        mkt_day = mkt.groupby(["date", "source"], as_index=False).agg(
-            spend=("spend", "sum"),
-            revenue=("revenue", "sum")
-        )
-        rev_compare = pd.merge(
-            biz.groupby("date", as_index=False).agg(total_revenue=("total_revenue", "sum")),
-            mkt_day.groupby("date", as_index=False).agg(attributed_revenue=("revenue", "sum")),
-            on="date", how="left"
-        )
-        fig_gap = px.area(
-            rev_compare, x="date", y=["total_revenue", "attributed_revenue"],
+    if not rev_compare.empty:
+        fig_gap = area_chart(
+            rev_compare, frame_hash(rev_compare), x="date", y=["total_revenue", "attributed_revenue"],
             title="Attribution Gap: Business Revenue vs Marketing-Attributed Revenue"
         )
         st.plotly_chart(fig_gap, use_container_width=True)
@@ -196,28 +447,31 @@ if not mkt.empty:
     st.subheader("📌 Key Insights")
     insights = []
 
-    # ROAS-based insights
-    roas = (mkt["revenue"].sum() / mkt["spend"].sum()) if mkt["spend"].sum() > 0 else 0
+    # ROAS-based insights (channel totals already hold the marketing sums)
+    mkt_sums = channel_perf[["spend", "revenue"]].sum()
+    total_spend, total_attributed = mkt_sums["spend"], mkt_sums["revenue"]
+    roas = (total_attributed / total_spend) if total_spend > 0 else 0
     if roas > 2:
         insights.append(f"✅ Strong performance: ROAS is {roas:.2f}x.")
     elif roas < 1:
         insights.append("⚠️ ROAS below 1 → marketing spend is not breaking even.")
 
     # CAC vs Margin
-    if not biz.empty and "orders" in biz.columns and "gross_profit" in biz.columns:
-        gross_margin = biz["gross_profit"].sum() / biz["orders"].sum() if biz["orders"].sum() > 0 else 0
-        cac = (mkt["spend"].sum() / biz["new_orders"].sum()) if "new_orders" in biz.columns and biz["new_orders"].sum() > 0 else 0
+    if "orders" in biz_totals and "gross_profit" in biz_totals:
+        gross_margin = biz_totals["gross_profit"] / biz_totals["orders"] if biz_totals["orders"] > 0 else 0
+        new_orders = biz_totals.get("new_orders", 0)
+        cac = (total_spend / new_orders) if new_orders > 0 else 0
         if cac > gross_margin:
             insights.append(f"⚠️ CAC (${cac:.2f}) exceeds margin per order (${gross_margin:.2f}) → unprofitable acquisition.")
 
-    # Top channel by ROAS
-    if not channel_perf.empty:
-        top_channel = channel_perf.sort_values("roas", ascending=False).iloc[0]["source"]
+    # Top channel by ROAS (all NaN when no channel has spend)
+    if channel_perf["roas"].notna().any():
+        top_channel = channel_perf.loc[channel_perf["roas"].idxmax(), "source"]
         insights.append(f"⭐ {top_channel} is the most efficient channel by ROAS.")
 
     # Customer mix
-    if not biz.empty and "orders" in biz.columns and "new_orders" in biz.columns:
-        if biz["new_orders"].sum() / max(biz["orders"].sum(), 1) > 0.5:
+    if "orders" in biz_totals and "new_orders" in biz_totals:
+        if biz_totals["new_orders"] / max(biz_totals["orders"], 1) > 0.5:
             insights.append("📈 More than half of orders are from new customers → strong acquisition momentum.")
 
     if insights: